@@ -1,16 +1,288 @@
 # court_manager.py
 import os
+import re
+import atexit
 import asyncio
+import functools
+import hashlib
+import sqlite3
+from collections import OrderedDict
 from pathlib import Path
 from dotenv import load_dotenv
 
-# model-court imports
-from model_court import Court, Prosecutor, Jury, Judge
-from model_court.code import SqliteCourtCode
-from model_court.references import SimpleTextStorage, LocalRAGReference
+# model-court is imported lazily inside build_court: it transitively pulls
+# in torch / sentence-transformers / chromadb, which workers that never
+# fact-check shouldn't pay for at import time.
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (once per process, even if several modules
+# guard the same way)
+if not os.getenv("_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_DOTENV_LOADED"] = "1"
+
+# Cosine similarity above which two claims are treated as the same claim
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX = 10000
+
+# Hard ceiling on a full court session; one stuck provider should fail the
+# request instead of stalling the Flask worker indefinitely.
+COURT_HEAR_TIMEOUT = float(os.getenv("COURT_HEAR_TIMEOUT", "120"))
+
+# Attempts for a full court session; transient provider errors (429/5xx,
+# network drops, timeouts) get retried with jittered exponential backoff
+# instead of failing the whole verification.
+COURT_HEAR_RETRIES = int(os.getenv("COURT_HEAR_RETRIES", "3"))
+
+# Opt-in: merge the two plain gpt-4o-mini juries (Logic + Community Watch)
+# into one combined-panel call, cutting one API round-trip per verification.
+# The Gemini, web-search and RAG juries stay separate because they use
+# different providers or per-call retrieved context.
+COURT_BATCH_JURIES = os.getenv("COURT_BATCH_JURIES") == "1"
+
+# Objection quorum that settles a verdict. The early-stop itself (cancel
+# remaining jury tasks once the quorum is monotonically decided) lives in
+# model-court's hear loop; from this side the quorum is the tunable knob —
+# lowering it ends clearly-fake sessions after fewer votes.
+COURT_QUORUM = int(os.getenv("COURT_QUORUM", "3"))
+
+# RAG jury knobs: the jury answers a structured "does the retrieved context
+# contradict the claim?" question, so it can run on a cheap model at
+# temperature 0 with a tight retrieval window. Both are overridable per
+# deployment without touching code.
+COURT_RAG_MODEL = os.getenv("COURT_RAG_MODEL", "openai/gpt-4o-mini")
+COURT_RAG_TOP_K = int(os.getenv("COURT_RAG_TOP_K", "3"))
+
+# Input budget in tokens. A hard character cut can still be ~18k tokens of
+# CJK text, billed across all 7 court calls; truncating by tokens keeps
+# the prompt size predictable. Falls back to the old 12k-char cut when
+# tiktoken is unavailable.
+COURT_TOKEN_BUDGET = int(os.getenv("COURT_TOKEN_BUDGET", "2048"))
+_token_encoding = None
+
+def _truncate_to_budget(text):
+    global _token_encoding
+    if _token_encoding is None:
+        try:
+            import tiktoken
+            _token_encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _token_encoding = False
+    if _token_encoding is False:
+        return text[:12000]
+    tokens = _token_encoding.encode(text)
+    if len(tokens) <= COURT_TOKEN_BUDGET:
+        return text
+    return _token_encoding.decode(tokens[:COURT_TOKEN_BUDGET])
+
+# ----------------------------------------------------------------------
+# Static court prompts and rules
+# Hoisted to module level so build_court doesn't reallocate ~5 KB of
+# string/dict literals per call, and so their text is hash-stable for
+# the response caches and provider prompt caches.
+# ----------------------------------------------------------------------
+PROSECUTOR_PROMPT = (
+    "You are a meticulous Fact Verification Prosecutor. "
+    "Your task is to evaluate the entire text as a single claim for fact-checking. "
+    "Rules:\n"
+    "1. DO NOT split the text into multiple claims.\n"
+    "2. Treat the entire input as one comprehensive claim to be verified.\n"
+    "3. If ANY statement in the text is problematic, the entire claim is problematic."
+)
+
+# Ordering contract for provider prefix caches: these prompts are the
+# static prefix of every call and must never have the claim or retrieved
+# context interpolated into them — dynamic content always follows in the
+# user turn, so the prefix stays byte-identical from call to call and
+# providers can serve it from cache.
+JURY_PROMPTS = {
+    "Logic_GPT": (
+        "You are a Logic Juror. Evaluate this claim for internal consistency "
+        "and alignment with established general knowledge.\n"
+        "Check for:\n"
+        "- Logical fallacies (e.g., contradiction, strawman).\n"
+        "- Impossibilities (e.g., historical dates that don't match, physics violations).\n"
+        "If the claim is logically sound and widely accepted as true, vote 'no_objection'."
+    ),
+    "Logic_Gemini": (
+        "You are a Skeptical Juror. Scrutinize this claim for potential misinformation. "
+        "Act as a Devil's Advocate: ask 'Is this misleading?' or 'Is this a rumor?'.\n"
+        "Look for:\n"
+        "- Exaggerated absolute terms (e.g., '100% confirmed').\n"
+        "- Sensationalist phrasing common in fake news.\n"
+        "If you find reasonable doubt or signs of manipulation, object immediately."
+    ),
+    "Web_Search_Jury": (
+        "You are a Web Verification Juror. Use the search tool to find external evidence "
+        "confirming or debunking this claim. "
+        "Prioritize authoritative sources (e.g., major news outlets, government sites, encyclopedia). "
+        "If search results contradict the claim, vote 'reasonable_doubt' and cite the source."
+    ),
+    "RAG_Jury": (
+        "You are the Knowledge Base Archivist. Verify this claim specifically against "
+        "the retrieved local documents. "
+        "If the retrieved context directly contradicts the claim, you MUST vote 'suspicious_fact'. "
+        "If the context is irrelevant, abstain."
+    ),
+    "User_Feedback_Jury": (
+        "You are the Community Watch Juror. Check the user feedback database. "
+        "Has this specific claim been previously reported as FAKE or CORRECTED by users? "
+        "If the database contains a user report refuting this, verify it and vote accordingly."
+    ),
+    "OpenAI_Panel_Jury": (
+        "You are a panel of two independent jurors voting as one.\n"
+        "Persona 1 - Logic Juror: evaluate the claim for internal "
+        "consistency, logical fallacies and impossibilities "
+        "(dates, physics, general knowledge).\n"
+        "Persona 2 - Community Watch Juror: check the provided "
+        "user feedback database for prior user reports marking "
+        "this claim as FAKE or CORRECTED.\n"
+        "If EITHER persona finds a problem, object. Only vote "
+        "'no_objection' when both personas are satisfied."
+    ),
+}
+
+VERDICT_RULES = {
+    "supported": {"operator": "eq", "value": 0},
+    "suspicious": {"operator": "lt", "value": 0.5}, # 半数以下是SUSPICIOUS
+    "refuted": "default"
+}
+
+# Static lookup tables for the verdict reports; suppress the terminal
+# summary entirely with COURT_QUIET=1 (stdout writes are a syscall per
+# line and add up on a busy server).
+COURT_QUIET = os.getenv("COURT_QUIET") == "1"
+DECISION_LABEL = {
+    "no_objection": "No Objection",
+    "reasonable_doubt": "Reasonable Doubt",
+    "suspicious_fact": "Suspicious Fact",
+}
+VERDICT_ICON = {"CLEAN": "✓", "FAKE": "✗", "SUSPICIOUS": "⚠"}
+
+# Lazily-loaded MiniLM embedder (same model family the RAG jury uses).
+# Kept at module level so every CourtManager shares one loaded model.
+_embedder = None
+
+# LRU cache of query embeddings: MiniLM on CPU costs ~10-30 ms per call,
+# a repeat claim should pay a dict lookup instead. Shared across managers.
+_embed_cache = OrderedDict()
+_EMBED_CACHE_MAX = 4096
+
+# Dynamic batching of embedding calls: under concurrent load, one
+# model.encode over a list of texts beats N separate single-text calls.
+# The tiny wait window keeps single-request latency unaffected.
+EMBED_BATCH_SIZE = 32
+EMBED_BATCH_WAIT = 0.005  # seconds
+_embed_batcher = None     # (event_loop, queue) bound to the running loop
+
+
+def _cache_embedding(key, vec):
+    _embed_cache[key] = vec
+    while len(_embed_cache) > _EMBED_CACHE_MAX:
+        _embed_cache.popitem(last=False)
+
+
+def _encode_normalized(texts):
+    """Encode a batch of texts into L2-normalized float32 vectors."""
+    import numpy as np
+    embedder = _get_embedder()
+    vecs = embedder.encode(texts, convert_to_numpy=True, batch_size=EMBED_BATCH_SIZE)
+    vecs = vecs.astype(np.float32)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+async def _embed_batch_worker(queue):
+    """Drain the embed queue, coalescing concurrent requests into batches."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + EMBED_BATCH_WAIT
+        while len(batch) < EMBED_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        try:
+            vecs = await loop.run_in_executor(
+                None, _encode_normalized, [text for text, _, _ in batch]
+            )
+            for (_, key, fut), vec in zip(batch, vecs):
+                _cache_embedding(key, vec)
+                if not fut.done():
+                    fut.set_result(vec)
+        except Exception as e:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+
+
+async def _embed_text_batched(text, key):
+    """Embed one text through the shared batching worker."""
+    global _embed_batcher
+    loop = asyncio.get_running_loop()
+    # The worker is bound to an event loop; recreate it if the caller runs
+    # on a different (or fresh) loop.
+    if _embed_batcher is None or _embed_batcher[0] is not loop:
+        queue = asyncio.Queue()
+        loop.create_task(_embed_batch_worker(queue))
+        _embed_batcher = (loop, queue)
+    fut = loop.create_future()
+    await _embed_batcher[1].put((text, key, fut))
+    return await fut
+
+# Shared HTTP client for all OpenRouter traffic. One HTTP/2 connection
+# multiplexes every concurrent jury call, instead of each call paying its
+# own TCP+TLS handshake to openrouter.ai.
+_http_client = None
+
+def _close_http_client():
+    if _http_client is not None:
+        try:
+            asyncio.run(_http_client.aclose())
+        except Exception:
+            pass
+
+def _get_http_client():
+    global _http_client
+    if _http_client is None:
+        import httpx
+        # httpx raises at client construction if the h2 extra is missing;
+        # fall back to HTTP/1.1 keepalive rather than killing the court.
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            timeout=30.0,
+        )
+        atexit.register(_close_http_client)
+    return _http_client
+
+
+# Drop the optional tuning keys (http_client/extra_body) from model
+# configs. Seeded from COURT_PLAIN_CONFIG for operators who know up
+# front; also flipped automatically when a deployed model-court
+# rejects the keys at build time.
+_plain_model_config = os.getenv("COURT_PLAIN_CONFIG") == "1"
+
+
+def _get_embedder():
+    global _embedder
+    if _embedder is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+            _embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        except Exception as e:
+            print(f"[COURT CACHE] Semantic cache disabled (embedder unavailable): {e}")
+            _embedder = False
+    return _embedder or None
 
 class CourtManager:
     def __init__(self):
@@ -25,48 +297,175 @@ class CourtManager:
         self.rag_db_storage = self.base_data_dir / "rag_vector_db"
         self.db_path = "./court_history.db"
 
-        self._init_directories()
+        # Court cache: building a Court reloads the SQLite history DB, the
+        # feedback file and the RAG vector store, so reuse one instance until
+        # the underlying data files actually change.
+        self._court = None
+        self._court_sig = None
+        self._court_lock = asyncio.Lock()
+
+        # Filesystem setup is deferred to first use so constructing the
+        # manager (e.g. at import) does no I/O.
+        self._fs_ready = False
+
+        # Exact-match verdict cache: repeat submissions of the same text
+        # (retries, resubmits, duplicate pages) should not re-run 7 LLM calls.
+        self._response_cache = OrderedDict()
+        self._response_cache_max = 1024
+
+        # Semantic verdict cache: near-duplicate claims (rephrasings of the
+        # same statement) hit the same verdict via MiniLM cosine similarity.
+        self._sem_matrix = None   # (N, dim) float32, rows L2-normalized
+        self._sem_results = []    # parallel list of cached result dicts
+
+        # (mtime_ns, text) cache of the user feedback file so build_court
+        # doesn't re-read a growing file when nothing changed.
+        self._feedback_cache = None
 
     def _init_directories(self):
-        """Ensure all necessary folders and files exist."""
-        self.base_data_dir.mkdir(exist_ok=True)
-        self.rag_source_folder.mkdir(parents=True, exist_ok=True)
-        self.rag_db_storage.mkdir(parents=True, exist_ok=True)
-        
+        """Ensure all necessary folders and files exist (idempotent)."""
+        if self._fs_ready:
+            return
+        # Two makedirs cover all three directories (parents are created too)
+        os.makedirs(self.rag_source_folder, exist_ok=True)
+        os.makedirs(self.rag_db_storage, exist_ok=True)
+
         if not self.user_feedback_path.exists():
             self.user_feedback_path.write_text(
-                "--- Trusted User Feedback Database Initialized ---\n", 
+                "--- Trusted User Feedback Database Initialized ---\n",
                 encoding="utf-8"
             )
 
-        if not any(self.rag_source_folder.iterdir()):
+        # Probe emptiness with a single scandir entry instead of listing
+        with os.scandir(self.rag_source_folder) as it:
+            folder_empty = next(it, None) is None
+        if folder_empty:
             sample_file = self.rag_source_folder / "readme.txt"
             sample_file.write_text(
                 "Place factual text files here for RAG verification.",
                 encoding="utf-8"
             )
 
-    def _get_model_config(self, model_name, temperature=0.1):
-        """Helper for OpenRouter config."""
+        self._fs_ready = True
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _get_model_config(model_name, temperature=0.1):
+        """Helper for OpenRouter config. Built once per (model, temperature)."""
         api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
-        return {
+        config = {
             "provider": "openai_compatible",
             "base_url": "https://openrouter.ai/api/v1",
             "api_key": api_key,
             "model_name": model_name,
-            "temperature": temperature
+            "temperature": temperature,
         }
+        # Optional tuning keys. model-court passes unknown config keys
+        # through to its OpenAI-compatible client; builds that reject
+        # them instead trigger the plain-config retry in _get_court, so
+        # the court keeps working without the connection/prompt-cache
+        # tuning.
+        if not _plain_model_config:
+            # All juries share one keepalive HTTP/2 client, so the five
+            # concurrent calls multiplex over a single warm connection.
+            config["http_client"] = _get_http_client()
+            # Prompt caching: every jury/prosecutor call re-sends the same
+            # static system prompt. OpenRouter forwards this marker to
+            # backends with explicit prompt caching (Anthropic/DeepSeek/Qwen)
+            # so the static prefix bills as discounted cache reads; OpenAI
+            # and Gemini prefix-cache automatically when the static text
+            # comes first, which our prompts already guarantee.
+            config["extra_body"] = {"cache_control": {"type": "ephemeral"}}
+        return config
+
+    def _tune_sqlite(self, court_code):
+        """
+        Apply performance pragmas to the court history database.
+
+        The defaults (journal_mode=DELETE, 2 MB page cache) serialize
+        concurrent writers on a write-heavy audit log. WAL and the larger
+        cache/mmap settings are the standard fix. journal_mode=WAL persists
+        in the database file, so even when we can't reach the library's own
+        connection the most important setting sticks.
+        """
+        conn = None
+        for attr in ("conn", "connection", "_conn", "_connection"):
+            candidate = getattr(court_code, attr, None)
+            if isinstance(candidate, sqlite3.Connection):
+                conn = candidate
+                break
+
+        owns_conn = conn is None
+        try:
+            if owns_conn:
+                conn = sqlite3.connect(self.db_path)
+            for pragma in (
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                "PRAGMA cache_size=-65536",       # 64 MB page cache
+                "PRAGMA temp_store=MEMORY",
+                "PRAGMA mmap_size=268435456",     # 256 MB
+                "PRAGMA wal_autocheckpoint=1000",
+            ):
+                conn.execute(pragma)
+        except Exception as e:
+            print(f"[COURT] SQLite tuning skipped: {e}")
+        finally:
+            if owns_conn and conn is not None:
+                conn.close()
+
+    def _rag_source_mtime(self):
+        return max(
+            (p.stat().st_mtime_ns for p in self.rag_source_folder.iterdir()),
+            default=0
+        )
+
+    def _rag_mode(self):
+        """
+        'append' re-scans (and may re-embed) the source folder, so only do
+        it when the folder actually changed since the last indexing run;
+        otherwise open the persisted vector store read-only.
+        """
+        sentinel = self.rag_db_storage / ".indexed_mtime"
+        current = str(self._rag_source_mtime())
+        try:
+            if sentinel.read_text() == current:
+                return "read"
+        except OSError:
+            pass
+        return "append"
 
-    def build_court(self) -> Court:
+    def _mark_rag_indexed(self):
+        sentinel = self.rag_db_storage / ".indexed_mtime"
+        sentinel.write_text(str(self._rag_source_mtime()))
+
+    def _read_feedback(self):
+        """Feedback file contents, re-read only when the file changed on disk."""
+        mtime = self.user_feedback_path.stat().st_mtime_ns
+        if self._feedback_cache is not None and self._feedback_cache[0] == mtime:
+            return self._feedback_cache[1]
+        text = self.user_feedback_path.read_text(encoding="utf-8")
+        self._feedback_cache = (mtime, text)
+        return text
+
+    def build_court(self) -> "Court":
         """
         Initialize Court with FACT-CHECKING FOCUSED prompts.
         """
-        
+        # Deferred imports: model-court drags in torch/chromadb, paid only
+        # when a court is actually built.
+        from model_court import Court, Prosecutor, Jury, Judge
+        from model_court.code import SqliteCourtCode
+        from model_court.references import SimpleTextStorage, LocalRAGReference
+
+        self._init_directories()
+
         # 1. Persistent Storage
         court_code = SqliteCourtCode(
             db_path=self.db_path,
             enable_vector_search=True
         )
+        self._tune_sqlite(court_code)
 
         # 2. Prosecutor: The Fact Extractor
         # Goal: Split text into atomic, checkable facts. Ignore opinions.
@@ -74,14 +473,7 @@ class CourtManager:
             court_code=court_code,
             auto_claim_splitting=False,
             model=self._get_model_config("openai/gpt-4o-mini", temperature=0.0),
-            prosecutor_prompt=(
-                "You are a meticulous Fact Verification Prosecutor. "
-                "Your task is to evaluate the entire text as a single claim for fact-checking. "
-                "Rules:\n"
-                "1. DO NOT split the text into multiple claims.\n"
-                "2. Treat the entire input as one comprehensive claim to be verified.\n"
-                "3. If ANY statement in the text is problematic, the entire claim is problematic."
-            )
+            prosecutor_prompt=PROSECUTOR_PROMPT
         )
 
         # 3. Juries: The Specialized Evaluators
@@ -92,14 +484,7 @@ class CourtManager:
             name="Logic_GPT",
             model=self._get_model_config("openai/gpt-4o-mini", temperature=0.0),
             reference=None,
-            jury_prompt=(
-                "You are a Logic Juror. Evaluate this claim for internal consistency "
-                "and alignment with established general knowledge.\n"
-                "Check for:\n"
-                "- Logical fallacies (e.g., contradiction, strawman).\n"
-                "- Impossibilities (e.g., historical dates that don't match, physics violations).\n"
-                "If the claim is logically sound and widely accepted as true, vote 'no_objection'."
-            )
+            jury_prompt=JURY_PROMPTS["Logic_GPT"]
         )
 
         # [Jury 2: Logic Gemini] - The Skeptic (Devil's Advocate)
@@ -108,14 +493,7 @@ class CourtManager:
             name="Logic_Gemini",
             model=self._get_model_config("google/gemini-2.5-flash-lite", temperature=0.1),
             reference=None,
-            jury_prompt=(
-                "You are a Skeptical Juror. Scrutinize this claim for potential misinformation. "
-                "Act as a Devil's Advocate: ask 'Is this misleading?' or 'Is this a rumor?'.\n"
-                "Look for:\n"
-                "- Exaggerated absolute terms (e.g., '100% confirmed').\n"
-                "- Sensationalist phrasing common in fake news.\n"
-                "If you find reasonable doubt or signs of manipulation, object immediately."
-            )
+            jury_prompt=JURY_PROMPTS["Logic_Gemini"]
         )
 
         # [Jury 3: Web Search] - The Researcher
@@ -124,47 +502,37 @@ class CourtManager:
             name="Web_Search_Jury",
             model=self._get_model_config("perplexity/sonar", temperature=0.0),
             reference=None,
-            jury_prompt=(
-                "You are a Web Verification Juror. Use the search tool to find external evidence "
-                "confirming or debunking this claim. "
-                "Prioritize authoritative sources (e.g., major news outlets, government sites, encyclopedia). "
-                "If search results contradict the claim, vote 'reasonable_doubt' and cite the source."
-            )
+            jury_prompt=JURY_PROMPTS["Web_Search_Jury"]
         )
 
         # [Jury 4: Local RAG] - The Archivist
         # Focus: Checking against the "Ground Truth" documents provided by admins.
+        # Retrieval goes through the Chroma store under rag_db_storage, which
+        # indexes embeddings with HNSW — top_k lookups are already approximate
+        # nearest neighbor, not a brute-force cosine scan over all chunks.
+        rag_mode = self._rag_mode()
         jury_rag = Jury(
             name="RAG_Jury",
-            model=self._get_model_config("openai/gpt-4o-mini", temperature=0.1),
+            model=self._get_model_config(COURT_RAG_MODEL, temperature=0.0),
             reference=LocalRAGReference(
                 collection_name="fact_check_knowledge",
                 persist_directory=str(self.rag_db_storage),
                 source_folder=str(self.rag_source_folder),
                 embedding_model="MiniLM",
-                mode="append",
-                top_k=3
+                mode=rag_mode,
+                top_k=COURT_RAG_TOP_K
             ),
-            jury_prompt=(
-                "You are the Knowledge Base Archivist. Verify this claim specifically against "
-                "the retrieved local documents. "
-                "If the retrieved context directly contradicts the claim, you MUST vote 'suspicious_fact'. "
-                "If the context is irrelevant, abstain."
-            )
+            jury_prompt=JURY_PROMPTS["RAG_Jury"]
         )
 
         # [Jury 5: User Feedback] - The Community Watch
         # Focus: Checking if users have previously flagged this.
-        feedback_content = self.user_feedback_path.read_text(encoding="utf-8")
+        feedback_content = self._read_feedback()
         jury_feedback = Jury(
             name="User_Feedback_Jury",
             model=self._get_model_config("openai/gpt-4o-mini", temperature=0.1),
             reference=SimpleTextStorage(text=feedback_content),
-            jury_prompt=(
-                "You are the Community Watch Juror. Check the user feedback database. "
-                "Has this specific claim been previously reported as FAKE or CORRECTED by users? "
-                "If the database contains a user report refuting this, verify it and vote accordingly."
-            )
+            jury_prompt=JURY_PROMPTS["User_Feedback_Jury"]
         )
 
         # 4. Judge: The Final Arbiter
@@ -174,24 +542,195 @@ class CourtManager:
         )
 
         # 5. Assemble
-        return Court(
+        # concurrency_limit must stay >= len(juries) so Court.hear fans all
+        # jury calls out in parallel (wall clock = max provider latency, not
+        # the sum). Keep it tied to the jury list rather than hardcoded.
+        if COURT_BATCH_JURIES:
+            # One call covers both gpt-4o-mini personas. The panel objects
+            # if EITHER persona would, so the vote stays conservative.
+            jury_panel = Jury(
+                name="OpenAI_Panel_Jury",
+                model=self._get_model_config("openai/gpt-4o-mini", temperature=0.0),
+                reference=SimpleTextStorage(text=feedback_content),
+                jury_prompt=JURY_PROMPTS["OpenAI_Panel_Jury"]
+            )
+            juries = [jury_panel, jury_gemini, jury_web, jury_rag]
+        else:
+            juries = [jury_gpt, jury_gemini, jury_web, jury_rag, jury_feedback]
+        court = Court(
             prosecutor=prosecutor,
-            juries=[jury_gpt, jury_gemini, jury_web, jury_rag, jury_feedback],
+            juries=juries,
             judge=judge,
-            verdict_rules={
-                "supported": {"operator": "eq", "value": 0},  
-                "suspicious": {"operator": "lt", "value": 0.5}, # 半数以下是SUSPICIOUS 
-                "refuted": "default"
-            },
-            quorum=3,
-            concurrency_limit=5
+            verdict_rules=VERDICT_RULES,
+            quorum=COURT_QUORUM,
+            concurrency_limit=len(juries)
+        )
+
+        # The reference indexed the sources above; record what it saw so the
+        # next build can open the store read-only.
+        if rag_mode == "append":
+            self._mark_rag_indexed()
+
+        return court
+
+    def _build_court_safe(self):
+        """
+        build_court with an automatic plain-config retry.
+
+        Whether model-court forwards unknown config keys to its
+        OpenAI-compatible client can't be verified offline; if the
+        deployed build rejects http_client/extra_body at construction,
+        rebuild once without them instead of degrading every verdict
+        to the fallback until an operator finds COURT_PLAIN_CONFIG.
+        """
+        global _plain_model_config
+        try:
+            return self.build_court()
+        except (TypeError, ValueError) as e:
+            if _plain_model_config:
+                raise
+            print(f"[COURT] Tuned model config rejected ({e}); retrying with plain config")
+            _plain_model_config = True
+            CourtManager._get_model_config.cache_clear()
+            return self.build_court()
+
+    def _court_signature(self):
+        """Mtime-based fingerprint of the data files a Court depends on."""
+        feedback_mtime = self.user_feedback_path.stat().st_mtime_ns
+        rag_mtime = max(
+            (p.stat().st_mtime_ns for p in self.rag_source_folder.iterdir()),
+            default=0
         )
+        return (feedback_mtime, rag_mtime)
+
+    async def _get_court(self) -> "Court":
+        """Return the cached Court, rebuilding only when its inputs changed."""
+        self._init_directories()
+        sig = self._court_signature()
+        if self._court is not None and sig == self._court_sig:
+            return self._court
+
+        # Lock so concurrent first-time requests don't each build a court
+        async with self._court_lock:
+            sig = self._court_signature()
+            if self._court is None or sig != self._court_sig:
+                self._court = self._build_court_safe()
+                self._court_sig = sig
+                # Cached verdicts reflect the previous feedback/RAG state;
+                # keeping them would let stale answers mask the rebuild
+                # (e.g. a user reporting a claim as FAKE must be able to
+                # change the verdict for repeat submissions).
+                self._response_cache.clear()
+                self._sem_matrix = None
+                self._sem_results = []
+        return self._court
+
+    async def _embed_claim(self, safe_text):
+        """L2-normalized MiniLM embedding of the claim, or None if disabled."""
+        if _get_embedder() is None:
+            return None
+
+        key = hashlib.sha256(safe_text.encode('utf-8')).digest()
+        cached = _embed_cache.get(key)
+        if cached is not None:
+            _embed_cache.move_to_end(key)
+            return cached
+
+        try:
+            return await _embed_text_batched(safe_text, key)
+        except Exception as e:
+            print(f"[COURT CACHE] Embedding failed, skipping semantic cache: {e}")
+            return None
+
+    def _semantic_lookup(self, query_vec):
+        """Return a cached result for a near-duplicate claim, if any."""
+        if query_vec is None or self._sem_matrix is None:
+            return None
+        sims = self._sem_matrix @ query_vec
+        best = int(sims.argmax())
+        if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+            print(f"[COURT CACHE] Semantic hit (cosine={sims[best]:.3f})")
+            return self._sem_results[best]
+        return None
+
+    def _semantic_store(self, query_vec, result):
+        if query_vec is None:
+            return
+        import numpy as np
+        row = query_vec.reshape(1, -1)
+        if self._sem_matrix is None:
+            self._sem_matrix = row
+        else:
+            self._sem_matrix = np.vstack([self._sem_matrix, row])
+        self._sem_results.append(result)
+        if len(self._sem_results) > SEMANTIC_CACHE_MAX:
+            self._sem_matrix = self._sem_matrix[1:]
+            self._sem_results.pop(0)
+
+    def _cache_key(self, safe_text):
+        """Hash of the claim after whitespace/case normalization."""
+        normalized = re.sub(r'\s+', ' ', safe_text.strip().lower())
+        return hashlib.sha256(normalized.encode('utf-8')).digest()
+
+    async def _hear_with_retry(self, court, safe_text):
+        """
+        Run a court session with a timeout, retrying transient failures.
+
+        One 429/500 from a provider previously failed the entire verify;
+        retry with jittered exponential backoff so a blip costs a short
+        delay instead of an error to the caller.
+        """
+        import httpx
+
+        async def _attempt():
+            return await asyncio.wait_for(
+                court.hear(safe_text), timeout=COURT_HEAR_TIMEOUT
+            )
+
+        try:
+            from tenacity import (
+                AsyncRetrying,
+                retry_if_exception_type,
+                stop_after_attempt,
+                wait_random_exponential,
+            )
+        except ImportError:
+            return await _attempt()
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(COURT_HEAR_RETRIES),
+            wait=wait_random_exponential(min=0.5, max=8),
+            retry=retry_if_exception_type(
+                (httpx.HTTPError, ConnectionError, asyncio.TimeoutError)
+            ),
+            reraise=True,
+        ):
+            with attempt:
+                return await _attempt()
 
     async def verify_text(self, text):
-        court = self.build_court()
-        safe_text = text[:12000]
+        court = await self._get_court()
+        safe_text = _truncate_to_budget(text)
+
+        # Exact-match cache: identical claims return the prior verdict
+        # without convening the court again.
+        cache_key = self._cache_key(safe_text)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+            print("[COURT CACHE] Exact match hit, returning cached verdict")
+            return cached
 
-        report = await court.hear(safe_text)
+        # Semantic cache: rephrased versions of a prior claim reuse its verdict
+        query_vec = await self._embed_claim(safe_text)
+        cached = self._semantic_lookup(query_vec)
+        if cached is not None:
+            return cached
+
+        # Timeout guard + retry: a single stuck jury (e.g. a dead search
+        # provider) must not stall the whole verification, and transient
+        # provider errors get retried with backoff.
+        report = await self._hear_with_retry(court, safe_text)
 
         verdict_map = {
             "supported": "CLEAN",
@@ -210,57 +749,73 @@ class CourtManager:
         res = report.claims[0]
         mapped_verdict = verdict_map.get(res.verdict, "SUSPICIOUS")
         
-        # ========== Print clear summary to terminal ==========
-        print("\n" + "=" * 80)
-        print("MODEL COURT VERDICT SUMMARY")
-        print("=" * 80)
-        
-        # Print Jury votes
-        print("\n📊 JURY VOTES:")
-        for vote in res.jury_votes:
-            vote_icon = "✓" if vote.decision == "no_objection" else "✗"
-            decision_color = vote.decision.replace("_", " ").title()
-            print(f"  {vote_icon} {vote.jury_name:20s} → {decision_color}")
-        
-        # Print Judge's decision
-        print(f"\n⚖️  JUDGE'S FINAL VERDICT: {mapped_verdict}")
-        if res.judge_reasoning:
-            print(f"\n💭 JUDGE'S REASONING:")
-            # Split reasoning into lines for better readability
-            reasoning_lines = res.judge_reasoning[:400].split('. ')
-            for line in reasoning_lines[:3]:  # Show first 3 sentences
-                if line.strip():
-                    print(f"   • {line.strip()}.")
-        
-        print("=" * 80 + "\n")
-        
-        # Build details for return
-        details_lines = []
-        icon = "✓" if mapped_verdict == "CLEAN" else ("✗" if mapped_verdict == "FAKE" else "⚠")
-        
-        details_lines.append(f"{icon} Overall Verdict: {mapped_verdict}")
-        details_lines.append("")
-        
+        # ========== Build both reports in a single pass over the votes ==========
+        icon = VERDICT_ICON.get(mapped_verdict, "⚠")
+
+        terminal_lines = [] if not COURT_QUIET else None
+        details_lines = [f"{icon} Overall Verdict: {mapped_verdict}", ""]
+
         if res.judge_reasoning:
-            details_lines.append(f"Judge's Reasoning:")
+            details_lines.append("Judge's Reasoning:")
             details_lines.append(f"{res.judge_reasoning}")
             details_lines.append("")
-        
-        # List jury votes and their decisions
+
         details_lines.append("Jury Votes:")
         for vote in res.jury_votes:
-            vote_icon = "✓" if vote.decision == "no_objection" else "⚠"
-            details_lines.append(f"  {vote_icon} {vote.jury_name}: {vote.decision}")
+            ok = vote.decision == "no_objection"
+            label = DECISION_LABEL.get(vote.decision) or vote.decision.replace("_", " ").title()
+            if terminal_lines is not None:
+                terminal_lines.append(f"  {'✓' if ok else '✗'} {vote.jury_name:20s} → {label}")
+            details_lines.append(f"  {'✓' if ok else '⚠'} {vote.jury_name}: {vote.decision}")
             if vote.reason:
                 details_lines.append(f"     Reasoning: {vote.reason[:200]}...")
-        
+
+        if terminal_lines is not None:
+            bar = "=" * 80
+            out = [
+                "", bar, "MODEL COURT VERDICT SUMMARY", bar,
+                "", "📊 JURY VOTES:", *terminal_lines,
+                "", f"⚖️  JUDGE'S FINAL VERDICT: {mapped_verdict}",
+            ]
+            if res.judge_reasoning:
+                out.append("")
+                out.append("💭 JUDGE'S REASONING:")
+                # Show first 3 sentences for readability
+                for line in res.judge_reasoning[:400].split('. ')[:3]:
+                    if line.strip():
+                        out.append(f"   • {line.strip()}.")
+            out.append(bar + "\n")
+            print("\n".join(out))
+
         details_str = "\n".join(details_lines)
         if not details_str:
             details_str = "Content verified. No logical fallacies or factual errors detected by the jury."
 
-        return {
+        result = {
             "confidence": mapped_verdict,
             "details": details_str
         }
 
-court_manager = CourtManager()
\ No newline at end of file
+        self._response_cache[cache_key] = result
+        while len(self._response_cache) > self._response_cache_max:
+            self._response_cache.popitem(last=False)
+        self._semantic_store(query_vec, result)
+
+        return result
+
+def _optimize_court_db(db_path="./court_history.db"):
+    """Let SQLite refresh its query-planner stats on shutdown."""
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA optimize")
+        conn.close()
+    except Exception:
+        pass
+
+atexit.register(_optimize_court_db)
+
+
+@functools.lru_cache(maxsize=None)
+def get_court_manager() -> CourtManager:
+    """Process-wide CourtManager, constructed on first use."""
+    return CourtManager()
\ No newline at end of file
@@ -62,7 +62,9 @@ def _build_session() -> requests.Session:
         allowed_methods=frozenset(["POST"]),
         raise_on_status=False,
     )
-    adapter = HTTPAdapter(max_retries=retries, pool_connections=10, pool_maxsize=10)
+    # Pool sized to match the server's LLM worker threads; a smaller pool
+    # discards connections beyond its size and re-opens them per request.
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=32, pool_maxsize=32)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
     return s